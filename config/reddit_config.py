@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
 import streamlit as st  # Only needed for st.secrets; safe to import locally
 
@@ -6,9 +8,23 @@ import streamlit as st  # Only needed for st.secrets; safe to import locally
 load_dotenv()
 
 
+def _probe_streamlit_secrets():
+    """Return True if a secrets.toml was found and parsed by Streamlit."""
+    try:
+        return st.secrets.load_if_toml_exists()
+    except Exception:
+        return False  # Malformed secrets.toml; fall back to environment variables
+
+
+# Probed once so get_secret doesn't raise and catch on every lookup locally.
+_HAS_STREAMLIT_SECRETS = _probe_streamlit_secrets()
+
+
+@lru_cache(maxsize=None)
 def get_secret(group, key, env_var=None):
     """
     Retrieve a secret from st.secrets first, then fall back to os.getenv.
+    Results are cached per (group, key, env_var) for the life of the process.
 
     Parameters:
         group (str): The group name in the secrets TOML (e.g., "reddit").
@@ -21,13 +37,10 @@ def get_secret(group, key, env_var=None):
     if env_var is None:
         env_var = f"{group.upper()}_{key.upper()}"
 
-    # Attempt to get from st.secrets if available.
-    try:
-        value = st.secrets[group][key]
+    if _HAS_STREAMLIT_SECRETS:
+        value = st.secrets.get(group, {}).get(key)
         if value:
             return value
-    except Exception:
-        pass  # st.secrets might not be available locally
 
     # Fallback to environment variable.
     return os.getenv(env_var)
@@ -40,9 +53,9 @@ REDDIT_CONFIG = {
     "user_agent": get_secret("reddit", "user_agent") or "f1rstaid:v1.0",
 }
 
-SUBREDDITS = ["f1visa", "optcpt", "immigration", "internationalstudents"]
+SUBREDDITS = ("f1visa", "optcpt", "immigration", "internationalstudents")
 
-SEARCH_TERMS = [
+SEARCH_TERMS = (
     "Day 1 CPT",
     "OPT STEM extension",
     "F1 visa renewal",
@@ -52,4 +65,4 @@ SEARCH_TERMS = [
     "STEM OPT",
     "F1 transfer",
     "F1 grace period",
-]
+)
@@ -1,4 +1,5 @@
-WEBSITE_SOURCES = [
+# A frozenset: duplicates collapse at import and membership checks are O(1).
+WEBSITE_SOURCES = frozenset([
     # USCIS Sources
     "https://www.uscis.gov/working-in-the-united-states/students-and-exchange-visitors/optional-practical-training-opt-for-f-1-students",
     "https://www.uscis.gov/working-in-the-united-states/students-and-exchange-visitors/optional-practical-training-extension-for-stem-students-stem-opt",
@@ -48,7 +49,7 @@ WEBSITE_SOURCES = [
     "https://studyinthestates.dhs.gov/students/work/obtaining-a-social-security-number",
     "https://studyinthestates.dhs.gov/students/training-opportunities-in-the-united-states",
     "https://studyinthestates.dhs.gov/students/work/individual-taxpayer-identification-number-itin",
-    "https://studyinthestates.dhs.gov/tools-menu/frequently-asked-questions"
+    "https://studyinthestates.dhs.gov/tools-menu/frequently-asked-questions",
 
     # ICE Sources
     "https://www.ice.gov/sevis/overview",
@@ -66,4 +67,4 @@ WEBSITE_SOURCES = [
     "https://blog.sprintax.com/f1-visa-tax-return-guide-international-students/",
     "https://cptdog.com/blogs/day-1-cpt-risks",
     "https://stilt.com/education/day-one-cpt-second-masters-no-h1b-us/",
-]
+])
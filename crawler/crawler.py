@@ -1,12 +1,18 @@
+import hashlib
 import logging
 import json
 import os
+import orjson
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
 from requests.adapters import HTTPAdapter
+from requests.compat import chardet
 from urllib3.util.retry import Retry
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # ---------------------------
 # CONFIGURATION
@@ -25,7 +31,7 @@ base_urls = [
    "https://studyinthestates.dhs.gov/stem-opt-hub/for-employers",
    "https://studyinthestates.dhs.gov/stem-opt-hub/for-students",
    "https://studyinthestates.dhs.gov/stem-opt-hub/for-schools",
-   "https://studyinthestates.dhs.gov/stem-opt-hub/additional-resources"
+   "https://studyinthestates.dhs.gov/stem-opt-hub/additional-resources",
    "https://www.uscis.gov/working-in-the-united-states/stem-employment-pathways",
    "https://www.uscis.gov/working-in-the-united-states/students-and-exchange-visitors",
    "https://studyinthestates.dhs.gov/sevis-help-hub/student-records",
@@ -57,16 +63,98 @@ f1_keywords = [
     "foreign national"
 ]
 
+# Relevance keywords with weights, matched against lowercased page text.
+POSITIVE_KEYWORDS = {
+    "cpt": 50,
+    "opt": 50,
+    "curricular practical training": 40,
+    "optional practical training": 40,
+    "work authorization": 30,
+    "employment authorization": 30,
+    "internship": 20,
+    "practical training": 30,
+    "F-1 visa": 50,
+    "F1 visa": 50,
+    "student visa": 50,
+    "international student": 20,
+    "foreign student": 20,
+    "foreign exchange visitor": 20,
+    "foreign scholar": 20,
+    "foreign researcher": 20,
+    "foreign academic": 20,
+    "student": 40,
+    "SEVP": 50,
+    "SEVIS": 40,
+    "STEM OPT": 50
+}
+# Negative keywords to avoid false positives from boilerplate or generic content.
+NEGATIVE_KEYWORDS = {
+    "international student": 5,
+    "global affairs": 70,
+    "study abroad": 80,
+    "university homepage": 70,
+    "contact us": 70,
+    "adoption": 100
+}
+# Net weight per keyword, so each keyword is counted with one scan per page.
+# Keywords are pre-encoded because pages are scanned as ASCII bytes.
+KEYWORD_WEIGHTS = tuple(
+    (keyword.encode("ascii"), POSITIVE_KEYWORDS.get(keyword, 0) - NEGATIVE_KEYWORDS.get(keyword, 0))
+    for keyword in {**POSITIVE_KEYWORDS, **NEGATIVE_KEYWORDS}
+)
+
+# Elements whose text is never part of a page's main content.
+BOILERPLATE_TAGS = frozenset({"nav", "header", "footer", "aside", "script", "style"})
+# String types get_text() includes; comments, doctypes, etc. are skipped.
+TEXT_NODE_TYPES = (NavigableString, CData)
+
 # Files for output and checkpointing.
 ROBOTS_MAPPING_FILE = (
-    "websites_robots.json"  # Mapping of base URL to robots.txt (single-line).
+    "websites_robots.json"  # Mapping of base URL to raw robots.txt text.
 )
 RELEVANT_URLS_FILE = "relevant_urls.txt"  # Final list of relevant URLs.
+RELEVANT_LOG_FILE = "relevant_{domain}.txt"  # Per-site append-only log of relevant URLs.
 CHECKPOINT_FILE = "crawler_state.json"  # Checkpoint file for pause/resume.
+CHECKPOINT_INTERVAL = 30  # Seconds between periodic checkpoints.
+ROBOTS_CACHE_TTL = 24 * 60 * 60  # Seconds before the robots.txt mapping is refetched.
 
 # Set to True to resume from a previous checkpoint if available.
 RESUME = True
 
+# Maximum number of in-flight page fetches per site.
+MAX_CONCURRENT_REQUESTS = 4
+# Pages larger than this (by Content-Length or bytes read) are skipped rather than parsed.
+MAX_PAGE_BYTES = 5_000_000
+
+# User agent sent with requests and matched against robots.txt rules.
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Headers sent with every request (robots.txt and page fetches).
+REQUEST_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Language": "en-US,en;q=0.9",
+}
+NO_PROXIES = {"http": None, "https": None}  # Bypass proxies
+
+# One shared session so keep-alive connections are reused across all
+# robots.txt and page fetches to the same host.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    # Transient failures are retried here with exponential backoff (honoring
+    # Retry-After), so fetch_page never has to sleep on errors itself.
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+    ),
+    pool_connections=32,
+    pool_maxsize=32,
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
 # ---------------------------
 # HELPER FUNCTIONS
 # ---------------------------
@@ -74,28 +162,20 @@ RESUME = True
 
 def get_robots_txt(base_url):
     """
-    Download the robots.txt with retries and proxy handling
+    Download the robots.txt using the shared session (retries, no proxies).
+    Returns "" when the site has none, or None if it could not be fetched.
     """
     robots_url = base_url.rstrip("/") + "/robots.txt"
-    session = requests.Session()
-
-    # Configure retries
-    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-
     try:
-        response = session.get(
+        response = SESSION.get(
             robots_url,
             timeout=10,
-            proxies={"http": None, "https": None},  # Bypass proxies
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            },
+            proxies=NO_PROXIES,
+            headers=REQUEST_HEADERS,
         )
         if response.status_code == 200:
-            single_line = " ".join(response.text.split())
             logger.info(f"Fetched robots.txt from {robots_url}")
-            return single_line
+            return response.text
         else:
             logger.warning(
                 f"Received status code {response.status_code} for {robots_url}"
@@ -103,74 +183,112 @@ def get_robots_txt(base_url):
             return ""
     except Exception as e:
         logger.error(f"Error fetching {robots_url}: {e}")
-        return ""
+        return None
 
 
-def parse_robots_txt(robots_txt):
+def fetch_page(url):
     """
-    Parse robots.txt content to extract disallowed and allowed paths.
-    Returns two lists: disallowed_paths and allowed_paths.
-    Note: This is a very basic parser.
+    Fetch a page with the shared session and return its HTML, or None on failure.
+    Runs on worker threads, so it only does network I/O and never touches crawl state.
     """
-    disallowed = []
-    allowed = []
-    if not robots_txt:
-        return disallowed, allowed
-    tokens = robots_txt.split()
-    for i, token in enumerate(tokens):
-        if token.lower().startswith("disallow:"):
-            path = (
-                token[9:].strip()
-                if len(token) > 9
-                else (tokens[i + 1] if i + 1 < len(tokens) else "")
-            )
-            if path:
-                disallowed.append(path)
-        elif token.lower().startswith("allow:"):
-            path = (
-                token[6:].strip()
-                if len(token) > 6
-                else (tokens[i + 1] if i + 1 < len(tokens) else "")
-            )
-            if path:
-                allowed.append(path)
-    return disallowed, allowed
+    try:
+        # Stream so the body is only downloaded and decoded for HTML pages.
+        with SESSION.get(
+            url,
+            timeout=15,
+            proxies=NO_PROXIES,
+            headers=REQUEST_HEADERS,
+            stream=True,
+        ) as response:
+            content_type = response.headers.get("Content-Type", "").lower()
+            if "text/html" not in content_type:
+                logger.info(f"Skipping non-HTML response ({content_type or 'unknown'}) for {url}")
+                return None
+            content_length = response.headers.get("Content-Length", "")
+            if content_length.isdigit() and int(content_length) > MAX_PAGE_BYTES:
+                logger.info(f"Skipping oversized page ({content_length} bytes) for {url}")
+                return None
+            # PythonAnywhere whitelist check; its block notice sits at the top
+            # of the page, so only the first few KB of raw bytes are scanned.
+            chunks = response.iter_content(4096)
+            head = next(chunks, b"")
+            if b"pythonanywhere" in head.lower():
+                logger.error("Blocked by PythonAnywhere's whitelist")
+                raise Exception("Domain not whitelisted on PythonAnywhere")
+
+            if response.status_code != 200:
+                logger.warning(f"Non-200 status code {response.status_code} for {url}")
+                return None
+
+            # Read the rest of the stream, enforcing the size cap for pages
+            # sent without a Content-Length header.
+            body = bytearray(head)
+            for chunk in chunks:
+                body += chunk
+                if len(body) > MAX_PAGE_BYTES:
+                    logger.info(f"Skipping oversized page (over {MAX_PAGE_BYTES} bytes) for {url}")
+                    return None
+            # Same decoding as response.text, which can't be used once the stream is read
+            encoding = response.encoding or chardet.detect(bytes(body))["encoding"] or "utf-8"
+            return body.decode(encoding, errors="replace")
+    except Exception as e:
+        logger.error(f"Error accessing {url}: {e}")
+        return None
 
 
-def is_allowed(url, disallowed, allowed):
+def canonicalize(url):
     """
-    Determine if a URL is allowed by comparing its path against the disallowed and allowed lists.
-    Allowed paths override disallowed paths.
+    Normalize a URL so trivially different spellings dedupe to one entry.
+    Lowercases the scheme and host, drops default ports and fragments,
+    sorts query parameters, and uses "/" for an empty path.
     """
     parsed = urlparse(url)
-    path = parsed.path
-    for allow_path in allowed:
-        if allow_path != "" and path.startswith(allow_path):
-            return True
-    for dis_path in disallowed:
-        if dis_path != "" and path.startswith(dis_path):
-            logger.debug(f"URL {url} is disallowed because it starts with {dis_path}")
-            return False
-    return True
+    try:
+        port = parsed.port
+    except ValueError:
+        return url  # Malformed port; leave the URL for the scheme/domain checks.
+    scheme = parsed.scheme.lower()
+    netloc = (parsed.hostname or "").lower()
+    default_port = {"http": 80, "https": 443}.get(scheme)
+    if port and port != default_port:
+        netloc += f":{port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, query, ""))
+
+
+def url_fingerprint(url):
+    """
+    Return a signed 64-bit BLAKE2b fingerprint of a URL.
+    Visited URLs are tracked by fingerprint rather than by the full string,
+    which keeps the visited set and its checkpoint small on large crawls.
+    """
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
 
 
 def extract_main_content(soup):
     """
-    Remove common boilerplate elements from the soup and return the main text.
-    This function removes elements like <nav>, <header>, <footer>, and <aside>.
+    Return the main text of the page, skipping common boilerplate elements.
+    Walks the <main> element (or the whole page if there is none) once,
+    pruning <nav>, <header>, <footer>, <aside>, <script> and <style>
+    subtrees instead of decomposing them, so the soup is left untouched.
     """
-    # Remove boilerplate elements.
-    for tag in soup(["nav", "header", "footer", "aside"]):
-        tag.decompose()
-
-    # Optionally, if there's a main content tag, focus on that.
-    main = soup.find("main")
-    if main:
-        text = main.get_text(separator=" ", strip=True)
-    else:
-        # Fallback: return text from entire page.
-        text = soup.get_text(separator=" ", strip=True)
-    return text
+    root = soup.find("main") or soup
+    parts = []
+    stack = [iter(root.children)]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, Tag):
+                if node.name not in BOILERPLATE_TAGS:
+                    stack.append(iter(node.children))
+                    break
+            elif type(node) in TEXT_NODE_TYPES:
+                text = node.strip()
+                if text:
+                    parts.append(text)
+        else:
+            stack.pop()
+    return " ".join(parts)
 
 
 def is_relevant(content):
@@ -179,52 +297,10 @@ def is_relevant(content):
     using a weighted scoring system. This version expects that 'content' is
     the main text of the page (with boilerplate removed).
     """
-    # Define positive keywords with weights.
-    positive_keywords = {
-        "cpt": 50,
-        "opt": 50,
-        "curricular practical training": 40,
-        "optional practical training": 40,
-        "work authorization": 30,
-        "employment authorization": 30,
-        "internship": 20,
-        "practical training": 30,
-        "F-1 visa": 50,
-        "F1 visa": 50,
-        "student visa": 50,
-        "international student": 20,
-        "foreign student": 20,
-        "foreign exchange visitor": 20,
-        "foreign scholar": 20,
-        "foreign researcher": 20,
-        "foreign academic": 20,
-        "student": 40,
-        "SEVP": 50,
-        "SEVIS": 40,
-        "STEM OPT": 50
-    }
-    # Negative keywords to avoid false positives from boilerplate or generic content.
-    negative_keywords = {
-        "international student": 5,
-        "global affairs": 70,
-        "study abroad": 80,
-        "university homepage": 70,
-        "contact us": 70,
-        "adoption": 100
-    }
-
-    text = content.lower()
-    score = 0
-
-    # Count positive occurrences.
-    for keyword, weight in positive_keywords.items():
-        occurrences = text.count(keyword)
-        score += weight * occurrences
-
-    # Subtract points for negative occurrences.
-    for keyword, weight in negative_keywords.items():
-        occurrences = text.count(keyword)
-        score -= weight * occurrences
+    # Keywords are all ASCII, so scanning ASCII bytes avoids str's
+    # per-character width handling in lower() and count().
+    text = content.encode("ascii", "ignore").lower()
+    score = sum(weight * text.count(keyword) for keyword, weight in KEYWORD_WEIGHTS)
     logging.info(f"Relevance score: {score}")
     # Define a threshold that you can adjust based on experimentation.
     
@@ -232,12 +308,29 @@ def is_relevant(content):
 
 
 def save_checkpoint(state):
-    """Save the crawler state to a checkpoint file."""
+    """
+    Save the crawler state to a checkpoint file.
+    Writes to a temporary file first and renames it into place, so an
+    interrupted save never leaves a truncated checkpoint behind. The state
+    holds the live sets/deques of each site; they are listed only here.
+    Relevant URLs are not part of it; they are appended to per-site logs.
+    Fetches still in flight are saved as URLs to visit, so a resumed crawl
+    fetches them again instead of losing them and their outlinks.
+    """
+    snapshot = {
+        "visited": state["visited"],
+        "to_visit": {
+            site: [*state["in_flight"].get(site, {}).values(), *frontier]
+            for site, frontier in state["to_visit"].items()
+        },
+    }
+    tmp_file = CHECKPOINT_FILE + ".tmp"
     try:
-        with open(CHECKPOINT_FILE, "w") as f:
-            json.dump(state, f, indent=2)
+        with open(tmp_file, "wb") as f:
+            f.write(orjson.dumps(snapshot, default=list))
+        os.replace(tmp_file, CHECKPOINT_FILE)
         logger.info(
-            f"Checkpoint saved with {len(state['visited'])} visited URLs, {len(state['to_visit'])} URLs to visit, and {len(state['relevant_urls'])} relevant URLs."
+            f"Checkpoint saved with {len(state['visited'])} visited URLs and {len(state['to_visit'])} URLs to visit."
         )
     except Exception as e:
         logger.error(f"Error saving checkpoint: {e}")
@@ -246,10 +339,10 @@ def save_checkpoint(state):
 def load_checkpoint():
     """Load the crawler state from a checkpoint file."""
     try:
-        with open(CHECKPOINT_FILE, "r") as f:
-            state = json.load(f)
+        with open(CHECKPOINT_FILE, "rb") as f:
+            state = orjson.loads(f.read())
         logger.info(
-            f"Resumed from checkpoint: {len(state['visited'])} visited URLs, {len(state['to_visit'])} URLs to visit, and {len(state['relevant_urls'])} relevant URLs."
+            f"Resumed from checkpoint: {len(state['visited'])} visited URLs and {len(state['to_visit'])} URLs to visit."
         )
         return state
     except Exception as e:
@@ -257,37 +350,104 @@ def load_checkpoint():
         return None
 
 
+def relevant_log_path(base_url):
+    """Return the per-site file that relevant URLs for base_url are appended to."""
+    domain = urlparse(base_url).netloc.replace(":", "_")
+    return RELEVANT_LOG_FILE.format(domain=domain)
+
+
+def enqueue(link, domain, robots, to_visit, queued, visited):
+    """
+    Queue a link for crawling if it is a new, allowed HTTP(S) URL on the site.
+    All checks happen here, once per discovery, so every queued URL can be
+    fetched as soon as it is popped.
+    """
+    link = canonicalize(link)
+    parsed_link = urlparse(link)
+    # Follow only valid HTTP links within the same domain.
+    if parsed_link.scheme not in ("http", "https") or domain not in parsed_link.netloc:
+        return
+    # Cheap set lookups first; most links are duplicates, so the robots.txt
+    # rule scan only runs for new ones.
+    if link in queued or url_fingerprint(link) in visited:
+        return
+    if not robots.can_fetch(USER_AGENT, link):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Link %s is disallowed, skipping.", link)
+        return
+    to_visit.append(link)
+    queued.add(link)
+
+
 # ---------------------------
 # STEP 1: Build Robots.txt Mapping for All Base URLs
 # ---------------------------
 robots_mapping = {}
 
+# Reuse the mapping from a previous run while it is fresh; robots.txt rarely changes.
+if (
+    os.path.exists(ROBOTS_MAPPING_FILE)
+    and time.time() - os.path.getmtime(ROBOTS_MAPPING_FILE) < ROBOTS_CACHE_TTL
+):
+    try:
+        with open(ROBOTS_MAPPING_FILE, "r") as f:
+            robots_mapping = json.load(f)
+        logger.info(f"Loaded cached robots.txt mapping from {ROBOTS_MAPPING_FILE}")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable {ROBOTS_MAPPING_FILE}: {e}")
+
+fetched = False
 for base_url in base_urls:
+    if base_url in robots_mapping:
+        continue
     robots_txt = get_robots_txt(base_url)
-    robots_mapping[base_url] = robots_txt
+    # Failed fetches are not cached, so the next run tries again.
+    if robots_txt is not None:
+        robots_mapping[base_url] = robots_txt
+        fetched = True
 
-with open(ROBOTS_MAPPING_FILE, "w") as f:
-    json.dump(robots_mapping, f, indent=2)
-logger.info(f"Saved robots.txt mapping to {ROBOTS_MAPPING_FILE}")
+if fetched:
+    with open(ROBOTS_MAPPING_FILE, "w") as f:
+        json.dump(robots_mapping, f, indent=2)
+    logger.info(f"Saved robots.txt mapping to {ROBOTS_MAPPING_FILE}")
 
 # ---------------------------
 # STEP 2: Crawl Websites and Filter for F-1 Relevant URLs with Checkpointing
 # ---------------------------
 
 # Overall state structure
-state = {"visited": {}, "to_visit": {}, "relevant_urls": {}}
+state = {"visited": {}, "to_visit": {}}
 
 # For each base URL, we'll store separate lists in our state.
 for base_url in base_urls:
     state["visited"][base_url] = []
-    state["to_visit"][base_url] = [base_url]
-    state["relevant_urls"][base_url] = []
+    state["to_visit"][base_url] = [canonicalize(base_url)]
 
 # If RESUME is True and a checkpoint exists, load it.
+resumed = False
 if RESUME and os.path.exists(CHECKPOINT_FILE):
     loaded_state = load_checkpoint()
     if loaded_state:
         state = loaded_state
+        resumed = True
+# Live Future -> URL maps of each site's unfinished fetches; not checkpointed as such.
+state["in_flight"] = {}
+started_logs = set()  # Logs already begun this run, by migration or an earlier site
+
+# Older checkpoints carried relevant URLs. The next checkpoint drops them, so
+# move every site's into its log now, before a crawl can be interrupted.
+for base_url, legacy_urls in state.pop("relevant_urls", {}).items():
+    relevant_log = relevant_log_path(base_url)
+    logged = set()
+    if os.path.exists(relevant_log):
+        with open(relevant_log, "r") as f:
+            logged.update(line.strip() for line in f if line.strip())
+    with open(relevant_log, "a") as f:
+        for url in legacy_urls:
+            if url not in logged:
+                f.write(url + "\n")
+                logged.add(url)
+    started_logs.add(relevant_log)
 
 # Process each website separately.
 try:
@@ -295,102 +455,80 @@ try:
         logger.info(f"Starting crawl for {base_url}")
         domain = urlparse(base_url).netloc
 
-        # Create a persistent session with retries
-        session = requests.Session()
-        retries = Retry(
-            total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504]
-        )
-        session.mount("https://", HTTPAdapter(max_retries=retries))
-
-        # Parse robots.txt for this site
-        disallowed, allowed = parse_robots_txt(robots_mapping.get(base_url, ""))
-        logger.info(
-            f"For {base_url}: Disallowed paths: {disallowed} | Allowed paths: {allowed}"
-        )
+        # Parse robots.txt for this site once; an empty file allows everything.
+        robots = RobotFileParser()
+        robots.parse(robots_mapping.get(base_url, "").splitlines())
+        logger.info(f"Loaded robots.txt rules for {base_url}")
 
         # Load state for this base_url if available
-        visited = set(state["visited"].get(base_url, []))
-        to_visit = state["to_visit"].get(base_url, [base_url])
-        relevant_urls = set(state["relevant_urls"].get(base_url, []))
-        batch_counter = 0  # Counter to trigger batch saving
-
-        while to_visit:
-            url = to_visit.pop(0)
-            if url in visited:
-                logger.debug(f"Already visited {url}, skipping.")
-                continue
-            if not is_allowed(url, disallowed, allowed):
-                logger.info(f"Skipping disallowed URL: {url}")
-                continue
-
-            visited.add(url)
-            try:
-                response = session.get(
-                    url,
-                    timeout=15,
-                    proxies={"http": None, "https": None},  # Explicitly disable proxies
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                        "Accept-Language": "en-US,en;q=0.9",
-                    },
-                )
-                # PythonAnywhere whitelist check
-                if "pythonanywhere" in response.text.lower():
-                    logger.error("Blocked by PythonAnywhere's whitelist")
-                    raise Exception("Domain not whitelisted on PythonAnywhere")
-
-                if response.status_code != 200:
-                    logger.warning(
-                        f"Non-200 status code {response.status_code} for {url}"
-                    )
-                    continue
-            except Exception as e:
-                logger.error(f"Error accessing {url}: {e}")
-                time.sleep(5)  # Add delay between retries
-                continue
-
-            page_text = response.text
-            soup = BeautifulSoup(page_text, "html.parser")
-            # Extract the main content to avoid boilerplate text.
-            main_content = extract_main_content(soup)
-            if is_relevant(main_content):
-                logger.info(f"Relevant page found: {url}")
-                if url not in relevant_urls:
-                    relevant_urls.add(url)
-                    batch_counter += 1
-
-            soup = BeautifulSoup(page_text, "html.parser")
-            for a_tag in soup.find_all("a", href=True):
-                link = urljoin(url, a_tag["href"])
-                parsed_link = urlparse(link)
-                # Follow only valid HTTP links within the same domain.
-                if (
-                    parsed_link.scheme in ("http", "https")
-                    and domain in parsed_link.netloc
-                ):
-                    if not is_allowed(link, disallowed, allowed):
-                        logger.debug(f"Link {link} on {url} is disallowed, skipping.")
+        # Older checkpoints stored visited URLs as strings; fingerprint those.
+        visited = {
+            entry if isinstance(entry, int) else url_fingerprint(entry)
+            for entry in state["visited"].get(base_url, [])
+        }
+        to_visit = deque()
+        queued = set()  # URLs in to_visit or in flight, for O(1) membership checks
+        # Checkpointed frontiers may predate the current rules; re-check them.
+        for link in state["to_visit"].get(base_url, [base_url]):
+            enqueue(link, domain, robots, to_visit, queued, visited)
+        # Relevant URLs go straight to an append-only log; the set only
+        # dedupes within this run. A fresh crawl starts a fresh log.
+        relevant_log = relevant_log_path(base_url)
+        append_log = resumed or relevant_log in started_logs
+        started_logs.add(relevant_log)
+        relevant_urls = set()
+        if append_log and os.path.exists(relevant_log):
+            with open(relevant_log, "r") as f:
+                relevant_urls.update(line.strip() for line in f if line.strip())
+        # Keep references to the live structures so checkpoints see updates.
+        state["visited"][base_url] = visited
+        state["to_visit"][base_url] = to_visit
+        last_checkpoint = time.monotonic()
+
+        # Fetch pages concurrently; parsing and all state updates stay on
+        # this thread, so the frontier structures need no locking.
+        with open(relevant_log, "a" if append_log else "w", buffering=1) as relevant_fh, \
+                ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            in_flight = {}  # Future -> URL being fetched
+            state["in_flight"][base_url] = in_flight
+            while to_visit or in_flight:
+                while to_visit and len(in_flight) < MAX_CONCURRENT_REQUESTS:
+                    # enqueue() already vetted the URL, so it can be fetched directly.
+                    # It stays in queued until the fetch finishes, so it isn't re-queued.
+                    url = to_visit.popleft()
+                    in_flight[executor.submit(fetch_page, url)] = url
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_text = future.result()
+                    # Only a finished fetch counts as visited; see save_checkpoint.
+                    url = in_flight.pop(future)
+                    queued.discard(url)
+                    visited.add(url_fingerprint(url))
+                    if page_text is None:
                         continue
-                    if link not in visited:
-                        to_visit.append(link)
 
-            # Update state for this base_url.
-            state["visited"][base_url] = list(visited)
-            state["to_visit"][base_url] = to_visit
-            state["relevant_urls"][base_url] = list(relevant_urls)
+                    # Parse once; the same soup serves content and link extraction.
+                    soup = BeautifulSoup(page_text, "lxml")
 
-            # Save checkpoint every 10 new relevant URLs.
-            if batch_counter >= 10:
-                save_checkpoint(state)
-                batch_counter = 0
+                    # Extract the main content to avoid boilerplate text.
+                    main_content = extract_main_content(soup)
+                    if is_relevant(main_content) and url not in relevant_urls:
+                        logger.info(f"Relevant page found: {url}")
+                        relevant_fh.write(url + "\n")
+                        relevant_urls.add(url)
+
+                    for a_tag in soup.find_all("a", href=True):
+                        enqueue(urljoin(url, a_tag["href"]), domain, robots, to_visit, queued, visited)
+
+                    # Save a checkpoint every CHECKPOINT_INTERVAL seconds.
+                    if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                        save_checkpoint(state)
+                        last_checkpoint = time.monotonic()
 
         logger.info(
             f"Finished crawling {base_url}. Visited {len(visited)} pages; found {len(relevant_urls)} relevant pages."
         )
-        # Update state in case we finished this base_url.
-        state["visited"][base_url] = list(visited)
-        state["to_visit"][base_url] = to_visit
-        state["relevant_urls"][base_url] = list(relevant_urls)
         save_checkpoint(state)
 
 except KeyboardInterrupt:
@@ -401,11 +539,14 @@ except KeyboardInterrupt:
 # ---------------------------
 # STEP 3: Save Relevant URLs to a Final File for ML Ingestion
 # ---------------------------
-all_relevant = []
-for base_url in base_urls:
-    all_relevant.extend(state["relevant_urls"].get(base_url, []))
-
+total_relevant = 0
 with open(RELEVANT_URLS_FILE, "w") as f:
-    for url in all_relevant:
-        f.write(url + "\n")
-logger.info(f"Saved total of {len(all_relevant)} relevant URLs to {RELEVANT_URLS_FILE}")
+    # Sites sharing a host share a log, so concatenate each file only once.
+    for relevant_log in dict.fromkeys(map(relevant_log_path, base_urls)):
+        if not os.path.exists(relevant_log):
+            continue
+        with open(relevant_log, "r") as log_f:
+            for url in log_f:
+                f.write(url)
+                total_relevant += 1
+logger.info(f"Saved total of {total_relevant} relevant URLs to {RELEVANT_URLS_FILE}")
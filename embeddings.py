@@ -0,0 +1,15 @@
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> OpenAIEmbeddings:
+    """
+    Return the process-wide embeddings client used by the ingestion scripts.
+    Sharing one instance reuses its HTTP connection pool across calls.
+    Embeds up to 1000 chunks per request, with retries for rate limits.
+    """
+    load_dotenv()
+    return OpenAIEmbeddings(chunk_size=1000, max_retries=6, request_timeout=60)
@@ -1,6 +1,13 @@
+import asyncio
+import base64
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
 from html import escape
 import logging
+from logging.handlers import MemoryHandler
 import os
+import pickle
 import re
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
@@ -8,22 +15,88 @@ from datetime import datetime
 from urllib.parse import urlparse
 import os.path
 
+import faiss
+import numpy as np
 import streamlit as st
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain.chains import RetrievalQA, LLMChain
+from langchain.chains import LLMChain
+from langchain.chains.question_answering import load_qa_chain
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import PromptTemplate
 from typing import Optional
 
-# Configure logging
+# Configure logging. File writes are buffered and flushed every 512 records,
+# on any error, and at interpreter exit (logging.shutdown flushes handlers).
+_LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+_file_handler = logging.FileHandler("f1rstaid.log")
+_file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("f1rstaid.log"), logging.StreamHandler()],
+    format=_LOG_FORMAT,
+    handlers=[
+        MemoryHandler(512, flushLevel=logging.ERROR, target=_file_handler),
+        logging.StreamHandler(),
+    ],
 )
 
+# Patterns used by F1rstAidApp.clean_markdown, compiled once.
+_RE_CODE_BLOCK = re.compile(r"```.*?```", re.DOTALL)
+_RE_TRIPLE_QUOTE = re.compile(r'""".*?"""', re.DOTALL)
+_RE_INLINE_CODE = re.compile(r"`([^`]+)`")
+# Closing ) is optional to handle truncated URLs
+_RE_MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)?")
+_RE_EMPH = re.compile(r"[*_~]")
+_RE_HEADING = re.compile(r"^\s*#+\s*", re.MULTILINE)
+
+# Lexical prefilter for the relevance check: questions naming a core F-1
+# term are relevant, clearly off-topic ones are not, and only the rest are
+# sent to the LLM. Matched against the lowercased question. Only unambiguous
+# terms count; "opt" and "stem" are everyday words ("opt out", "stem cell"),
+# so they only count next to a qualifier.
+_RE_RELEVANT_TERMS = re.compile(
+    r"\b(?:f-1|f1\s+(?:visa|status|students?)|i-?20|i-?765|i-?983|h-?1b|sevis|sevp"
+    r"|uscis|cpt|stem\s+opt|opt\s+(?:ead|extension|application|processing|approval"
+    r"|unemployment|status))\b"
+)
+_RE_OFF_TOPIC_TERMS = re.compile(
+    r"\b(?:weather|recipes?|cooking|stocks?|crypto|sports?|movies?|songs?|jokes?)\b"
+)
+
+# Fields of the relevance check's structured reply, each parsed on its own so
+# one missing or reformatted field doesn't lose the others. Labels may be
+# wrapped in markdown ("**Reason:**") and values in the prompt's brackets.
+_RE_RELEVANCE = re.compile(
+    r"\brelevance[*_]*\s*:[*_]*[ \t]*\[?[ \t]*(yes|no)\b", re.IGNORECASE
+)
+_RE_REASON = re.compile(r"\breason[*_]*\s*:[*_]*[ \t]*([^\n]*)", re.IGNORECASE)
+_RE_GUIDANCE = re.compile(r"\bguidance[*_]*\s*:[*_]*[ \t]*([^\n]*)", re.IGNORECASE)
+
+# Bytes read per chunk when base64-encoding PDFs; a multiple of 3 so the
+# encoded chunks concatenate without padding in between.
+_PDF_CHUNK_SIZE = 3 * 64 * 1024
+
+
+@lru_cache(maxsize=16)
+def _encode_pdf_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    """Base64-encode a PDF; the mtime and size key the cache to the file's contents."""
+    parts = []
+    with open(file_path, "rb") as file:
+        while chunk := file.read(_PDF_CHUNK_SIZE):
+            parts.append(base64.b64encode(chunk))
+    return b"".join(parts).decode()
+
+
+@lru_cache(maxsize=256)
+def _web_source_link(source: str) -> str:
+    """Build the link for a web or Reddit source; sources repeat across renders."""
+    # Check if URL is valid
+    parsed = urlparse(source)
+    if parsed.scheme and parsed.netloc:
+        return f"<a href='{source}' target='_blank'>{source} 🔗</a>"
+    return "Invalid URL ❌"
+
 
 @dataclass
 class AppConfig:
@@ -33,6 +106,23 @@ class AppConfig:
     vector_store_path: str = "faiss_index"
     search_k: int = 5
     temperature: float = 0.7
+    # Retrieved chunks are stuffed into one prompt; past this many estimated
+    # tokens the answer is refined chunk by chunk instead.
+    max_stuff_tokens: int = 12000
+    # Semantic answer cache: most answers kept, and the max squared L2
+    # distance between question embeddings that counts as the same question.
+    # For unit-length embeddings this is 2 - 2*cosine, so 0.04 only matches
+    # at cosine >= 0.98. Questions differing in one key term ("OPT" vs "CPT")
+    # can embed above cosine 0.9 and must not share an answer.
+    answer_cache_size: int = 256
+    answer_cache_threshold: float = 0.04
+    # Memory-map IVF indexes (written by ingest.py for large corpora) so
+    # their inverted lists are paged in from the OS cache and shared by
+    # workers. FAISS 1.8 still copies flat and scalar-quantizer codes into
+    # RAM under IO_FLAG_MMAP, so other index types are loaded normally.
+    mmap_index: bool = True
+    # Search breadth for HNSW indexes built by validate_index.py.
+    hnsw_ef_search: int = 64
     GENERIC_HELP_QUESTIONS = {
         "help": {
             "response": """
@@ -49,14 +139,15 @@ Ask me specific questions like:
 - 'How long does OPT processing take after submitting Form I-765?'
 - 'What are the CPT requirements for summer internships?'
                 """,
-            "triggers": [
+            # Lowercase, matched against the lowercased question
+            "triggers": (
                 "what can you do",
                 "how to use",
                 "help",
                 "expertise",
                 "what do i ask you",
-                "what's your name"
-            ],
+                "what's your name",
+            ),
         },
         "question_guidance": {
             "response": """
@@ -68,24 +159,40 @@ Ask me specific questions like:
 
 Example: 'What documents do I need for STEM OPT extension?'\n
                 """,
-            "triggers": [
+            "triggers": (
                 "ask a question",
                 "formulate",
                 "effective questions",
                 "how to ask you",
-            ],
+            ),
         },
     }
 
 
+# One compiled alternation per help entry, checked in dict order so earlier
+# entries keep priority over later ones.
+_HELP_PATTERNS = tuple(
+    (key, entry, re.compile("|".join(map(re.escape, entry["triggers"]))))
+    for key, entry in AppConfig.GENERIC_HELP_QUESTIONS.items()
+)
+
+
 class F1rstAidApp:
     """Main application class for F1rstAid."""
 
     def __init__(self, config: AppConfig):
         self.config = config
         self.qa_chain = None
+        self._refine_chain = None
+        self._relevance_chain = None
         self.embeddings = None
         self.db = None
+        self._help_patterns = _HELP_PATTERNS
+        # Answers to earlier questions, keyed by their id in the FAISS index
+        # of question embeddings and ordered from least to most recently used.
+        self._answer_cache_index = None
+        self._answer_cache = OrderedDict()
+        self._next_answer_id = 0
 
     def initialize(self) -> bool:
         """Initialize the application components."""
@@ -97,38 +204,103 @@ class F1rstAidApp:
             self.embeddings = OpenAIEmbeddings()
 
             logging.info("Loading vector store...")
-            self.db = FAISS.load_local(
-                self.config.vector_store_path,
-                self.embeddings,
-                allow_dangerous_deserialization=True,
-            )
-
-            logging.info("Setting up retriever and QA chain...")
-            retriever = self.db.as_retriever(
-                search_type="similarity", 
-                search_kwargs={"k": self.config.search_k}
-            )
-
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=ChatOpenAI(
-                    model_name=self.config.model_name,
-                    temperature=self.config.temperature,
-                ),
-                retriever=retriever,
-                chain_type="map_reduce",
-                return_source_documents=True,
+            self.db = self._load_vector_store()
+            self._tune_index()
+            self._init_answer_cache(self.db.index.d)
+
+            logging.info("Setting up QA chains...")
+            llm = ChatOpenAI(
+                model_name=self.config.model_name,
+                temperature=self.config.temperature,
             )
+            # One LLM call over all retrieved chunks instead of map_reduce's
+            # k + 1; refine is kept for contexts too large to stuff. Retrieval
+            # happens in get_answer, with the question's embedding.
+            self.qa_chain = load_qa_chain(llm, chain_type="stuff")
+            self._refine_chain = load_qa_chain(llm, chain_type="refine")
+            # Built once and reused, so its HTTP client keeps connections alive
+            self._relevance_chain = self._build_relevance_chain()
 
             logging.info("Application initialized successfully")
             return True
 
         except Exception as e:
-            logging.error(f"Initialization failed: {str(e)}")
+            logging.error("Initialization failed: %s", e)
             return False
 
-    def get_secret(self, group, key, env_var=None):
+    def _load_vector_store(self) -> FAISS:
+        """Load the FAISS vector store, memory-mapping IVF indexes when enabled."""
+        path = self.config.vector_store_path
+        index_path = os.path.join(path, "index.faiss")
+        if self.config.mmap_index and self._is_ivf_index_file(index_path):
+            try:
+                index = faiss.read_index(
+                    index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+                # FAISS.load_local can't pass IO flags, so read its docstore
+                # pickle directly: (docstore, index_to_docstore_id)
+                with open(os.path.join(path, "index.pkl"), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                return FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+            except Exception as e:
+                logging.warning("Memory-mapped index load failed, reading it fully: %s", e)
+
+        return FAISS.load_local(
+            path,
+            self.embeddings,
+            allow_dangerous_deserialization=True,
+        )
+
+    @staticmethod
+    def _is_ivf_index_file(index_path: str) -> bool:
+        """Whether a serialised FAISS index is an IVF type, by its fourcc header."""
+        try:
+            with open(index_path, "rb") as f:
+                return f.read(2) == b"Iw"  # IwFl, IwSq, IwPQ, ...
+        except OSError:
+            return False
+
+    def _tune_index(self) -> None:
+        """
+        Apply search-time settings to the loaded index. Index structure is
+        chosen offline (ingest.py, validate_index.py), never by a session.
+        """
+        if isinstance(self.db.index, faiss.IndexHNSW):
+            self.db.index.hnsw.efSearch = self.config.hnsw_ef_search
+
+    def _init_answer_cache(self, dimension: int) -> None:
+        """Create an empty answer cache for question embeddings of the given size."""
+        self._answer_cache_index = faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+        self._answer_cache.clear()
+
+    def _lookup_cached_answer(self, vector: np.ndarray) -> Optional[Dict]:
+        """Return the cached answer to a near-identical earlier question, if any."""
+        if not self._answer_cache:
+            return None
+        distances, ids = self._answer_cache_index.search(vector, 1)
+        answer_id = int(ids[0, 0])
+        if answer_id == -1 or distances[0, 0] >= self.config.answer_cache_threshold:
+            return None
+        self._answer_cache.move_to_end(answer_id)
+        return self._answer_cache[answer_id]
+
+    def _cache_answer(self, vector: np.ndarray, answer: Dict) -> None:
+        """Store an answer, evicting the least recently used one when full."""
+        answer_id = self._next_answer_id
+        self._next_answer_id += 1
+        self._answer_cache_index.add_with_ids(vector, np.array([answer_id], dtype="int64"))
+        self._answer_cache[answer_id] = answer
+        if len(self._answer_cache) > self.config.answer_cache_size:
+            evicted_id, _ = self._answer_cache.popitem(last=False)
+            self._answer_cache_index.remove_ids(np.array([evicted_id], dtype="int64"))
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def get_secret(group, key, env_var=None):
         """
         Retrieve a secret from st.secrets first, then fall back to environment variables.
+        Results, including misses, are cached per process, so st.secrets is
+        only read (and logged) on the first lookup of each secret.
 
         Parameters:
         group (str): The group name in the TOML configuration (e.g., "openai").
@@ -143,8 +315,8 @@ class F1rstAidApp:
         if env_var is None:
             env_var = f"{group.upper()}_{key.upper()}"
 
-        logging.info(f"Fetching secret: {group}/{key}")
-        logging.info(f"Environment variable: {env_var}")
+        logging.info("Fetching secret: %s/%s", group, key)
+        logging.info("Environment variable: %s", env_var)
 
         # Try to fetch from st.secrets.
         try:
@@ -153,7 +325,7 @@ class F1rstAidApp:
                 if group in st.secrets and key in st.secrets[group]:
                     return st.secrets[group][key]
         except Exception as e:
-            logging.info(f"st.secrets not available: {e}")
+            logging.info("st.secrets not available: %s", e)
 
         # Fallback to using os.getenv.
         return os.getenv(env_var)
@@ -164,52 +336,85 @@ class F1rstAidApp:
         if not api_key:
             logging.error("OPENAI_API_KEY not found")
             return False
-        os.environ["OPENAI_API_KEY"] = api_key
+        # Environment writes take a process-wide lock; skip them when unchanged.
+        if os.environ.get("OPENAI_API_KEY") != api_key:
+            os.environ["OPENAI_API_KEY"] = api_key
         return True
 
     def _is_relevant_question(self, question: str) -> Tuple[bool, str]:
         """Check relevance with layered analysis."""
-        clean_q = question.strip().lower()
+        verdict = self._lexical_relevance(question.strip().lower())
+        if verdict is not None:
+            return verdict
+        return self._llm_relevance(question)
 
+    def _lexical_relevance(self, clean_q: str) -> Optional[Tuple[bool, str]]:
+        """Return the verdict of the cheap checks, or None if they are inconclusive."""
         # First check for predefined help questions
-        for entry in self.config.GENERIC_HELP_QUESTIONS.values():
-            if any(trigger in clean_q for trigger in entry["triggers"]):
-                return True, "Help question detected"
-
-        # LLM-based relevance check for other questions
-        relevance_prompt = PromptTemplate.from_template(
-            """Analyze if this question relates to F-1 visas, OPT, CPT, or related topics.
-            Respond EXACTLY in this format:
-            Relevance: [yes/no]
-            Reason: [1-2 sentence explanation]
-            Guidance: [Specific improvement suggestions if irrelevant]
-
-            Question: {question}"""
-        )
+        if self._match_help_question(clean_q):
+            return True, "Help question detected"
+
+        # Cheap lexical checks before paying for an LLM call
+        if _RE_RELEVANT_TERMS.search(clean_q):
+            return True, "Question mentions an F-1 topic"
+        if _RE_OFF_TOPIC_TERMS.search(clean_q):
+            return False, (
+                "This question does not appear to be about F-1 visas, OPT, or CPT. "
+                "Try asking about your F-1 status, work authorization, or related forms."
+            )
+        return None
 
+    def _llm_relevance(self, question: str) -> Tuple[bool, str]:
+        """LLM-based relevance check for questions the lexical checks can't decide."""
         try:
-            llm = ChatOpenAI(temperature=0.3, max_tokens=1000)
-            chain = LLMChain(llm=llm, prompt=relevance_prompt)
-            response = chain.invoke({"question": question})["text"]
+            if self._relevance_chain is None:
+                self._relevance_chain = self._build_relevance_chain()
+            response = self._relevance_chain.invoke({"question": question})["text"]
 
             # Parse structured response
-            relevance = "relevance: yes" in response.lower()
-            reason = self._parse_response_section(response, "Reason:")
-            guidance = self._parse_response_section(response, "Guidance:")
+            match = _RE_RELEVANCE.search(response)
+            if match:
+                relevance = match.group(1).lower() == "yes"
+            else:
+                relevance = "relevance: yes" in response.lower()
+            reason = self._parse_response_field(_RE_REASON, response)
+            guidance = self._parse_response_field(_RE_GUIDANCE, response)
 
             return relevance, f"{reason} {guidance}"
 
         except Exception as e:
-            logging.error(f"Relevance check failed: {str(e)}")
+            logging.error("Relevance check failed: %s", e)
             return False, "Error analyzing question. Please try again."
 
     @staticmethod
-    def _parse_response_section(response: str, header: str) -> str:
-        """Extract specific section from formatted response."""
-        try:
-            return response.split(header)[1].split("\n")[0].strip()
-        except (IndexError, AttributeError):
+    def _parse_response_field(pattern: re.Pattern, response: str) -> str:
+        """Extract one field's value, without surrounding markdown or brackets."""
+        match = pattern.search(response)
+        if not match:
             return "Unable to parse response."
+        return match.group(1).strip().strip("*_").strip().strip("[]").strip()
+
+    @staticmethod
+    def _build_relevance_chain() -> LLMChain:
+        """Build the LLM chain that classifies question relevance."""
+        relevance_prompt = PromptTemplate.from_template(
+            """Analyze if this question relates to F-1 visas, OPT, CPT, or related topics.
+            Respond EXACTLY in this format:
+            Relevance: [yes/no]
+            Reason: [1-2 sentence explanation]
+            Guidance: [Specific improvement suggestions if irrelevant]
+
+            Question: {question}"""
+        )
+        llm = ChatOpenAI(temperature=0.3, max_tokens=1000)
+        return LLMChain(llm=llm, prompt=relevance_prompt)
+
+    def _match_help_question(self, clean_q: str) -> Optional[Tuple[str, Dict]]:
+        """Return the (key, entry) of the first help entry triggered by the question."""
+        for key, entry, pattern in self._help_patterns:
+            if pattern.search(clean_q):
+                return key, entry
+        return None
 
     def get_answer(self, question: str) -> Optional[Dict]:
         """Process question with layered relevance handling."""
@@ -222,14 +427,22 @@ class F1rstAidApp:
                 }
 
             # Check for predefined help questions
-            clean_q = question.strip().lower()
-            for key, entry in self.config.GENERIC_HELP_QUESTIONS.items():
-                if any(trigger in clean_q for trigger in entry["triggers"]):
-                    logging.info(f"Help question detected: {key}")
-                    return {"result": entry["response"], "source_documents": []}
-
-            # LLM relevance analysis
-            relevant, explanation = self._is_relevant_question(question)
+            help_match = self._match_help_question(question.strip().lower())
+            if help_match:
+                key, entry = help_match
+                logging.info("Help question detected: %s", key)
+                return {"result": entry["response"], "source_documents": []}
+
+            # Lexical checks first; only the LLM relevance analysis is slow
+            # enough to overlap with embedding the question
+            embedding = None
+            verdict = self._lexical_relevance(question.strip().lower())
+            if verdict is None:
+                (relevant, explanation), embedding = asyncio.run(
+                    self._check_and_embed(question)
+                )
+            else:
+                relevant, explanation = verdict
 
             if not relevant:
                 return {
@@ -245,32 +458,59 @@ class F1rstAidApp:
                     "source_documents": [],
                 }
 
-            # Process relevant questions
-            answer = self.qa_chain.invoke(
-                {"query": question, "return_only_outputs": True}
-            )
-            logging.info(f"Answer generated: {answer}")
+            if embedding is None:
+                embedding = self.embeddings.embed_query(question)
+
+            # Reuse the answer to a paraphrase of an earlier question
+            vector = np.asarray([embedding], dtype="float32")
+            cached = self._lookup_cached_answer(vector)
+            if cached is not None:
+                logging.info("Answer served from cache")
+                return cached
+
+            # Process relevant questions, retrieving with the embedding above
+            docs = self.db.similarity_search_by_vector(embedding, k=self.config.search_k)
+            combine_chain = self.qa_chain
+            # Rough estimate of ~4 characters per token
+            if sum(len(doc.page_content) for doc in docs) // 4 > self.config.max_stuff_tokens:
+                logging.info("Retrieved context too large to stuff, refining instead")
+                combine_chain = self._refine_chain
+            output = combine_chain.invoke({"input_documents": docs, "question": question})
+            answer = {
+                "query": question,
+                "result": output[combine_chain.output_key],
+                "source_documents": docs,
+            }
+            logging.info("Answer generated: %s", answer)
+            self._cache_answer(vector, answer)
             return answer
 
         except Exception as e:
-            logging.error(f"Processing error: {str(e)}")
+            logging.error("Processing error: %s", e)
             return {
                 "result": "Error processing request. Please try again.",
                 "source_documents": [],
             }
 
+    async def _check_and_embed(self, question: str) -> Tuple[Tuple[bool, str], List[float]]:
+        """Run the LLM relevance check and embed the question concurrently."""
+        # Both run in worker threads: the sync clients are safe to reuse
+        # across asyncio.run calls, unlike async clients bound to a closed loop.
+        embed_query = self.embeddings.embed_query
+        return await asyncio.gather(
+            asyncio.to_thread(self._llm_relevance, question),
+            asyncio.to_thread(embed_query, question),
+        )
+
     @staticmethod
     def _get_source_link(source: str, doc_type: str) -> str:
         """Generate appropriate hyperlink based on source type."""
         try:
             if doc_type == "web" or doc_type == "reddit":
-                # Check if URL is valid
-                parsed = urlparse(source)
-                if parsed.scheme and parsed.netloc:
-                    return f"<a href='{source}' target='_blank'>{source} 🔗</a>"
-                else:
-                    return "Invalid URL ❌"
+                return _web_source_link(source)
             elif doc_type == "pdf":
+                # Not cached: the file may appear or change between renders;
+                # the expensive base64 encoding is cached by _encode_pdf.
                 # Using st.markdown's native PDF handling
                 filename = os.path.basename(source)
                 full_path = os.path.abspath(os.path.join("docs", filename))
@@ -281,130 +521,85 @@ class F1rstAidApp:
                     )
             return "Source unavailable ❌"
         except Exception as e:
-            logging.error(f"Error creating source link: {e}")
+            logging.error("Error creating source link: %s", e)
             return "Source link error ⚠️"
 
     @staticmethod
     def _encode_pdf(file_path: str) -> str:
         """Encode PDF file to base64 for browser download."""
-        import base64
-
         try:
-            with open(file_path, "rb") as file:
-                return base64.b64encode(file.read()).decode()
+            stat = os.stat(file_path)
+            return _encode_pdf_cached(file_path, stat.st_mtime_ns, stat.st_size)
         except Exception as e:
-            logging.error(f"Error encoding PDF {file_path}: {e}")
+            logging.error("Error encoding PDF %s: %s", file_path, e)
             return ""
 
     @staticmethod
     def clean_markdown(text: str) -> str:
         """Remove common markdown link and emphasis syntax from text."""
+        # Each pass only runs if its marker occurs; the substring checks are
+        # far cheaper than a regex scan, and most text has few markers.
         # Remove code blocks
-        text = re.sub(r"```.*?```", "", text, flags=re.DOTALL)
-        text = re.sub(r'""".*?"""', "", text, flags=re.DOTALL)
+        if "```" in text:
+            text = _RE_CODE_BLOCK.sub("", text)
+        if '"""' in text:
+            text = _RE_TRIPLE_QUOTE.sub("", text)
 
         # Remove inline code markers (`)
-        text = re.sub(r"`([^`]+)`", r"\1", text)
+        if "`" in text:
+            text = _RE_INLINE_CODE.sub(r"\1", text)
 
-        # Remove markdown links (updated regex to handle truncated URLs)
-        text = re.sub(
-            r"\[([^\]]+)\]\([^)]*\)?", r"\1", text
-        )  # Added optional closing )
+        # Remove markdown links (keeping the link text)
+        if "](" in text:
+            text = _RE_MD_LINK.sub(r"\1", text)
 
         # Remove emphasis markers: *, _, ~
-        text = re.sub(r"[*_~]", "", text)
+        text = _RE_EMPH.sub("", text)
 
         # Remove any leading heading markers
-        text = re.sub(r"^\s*#+\s*", "", text, flags=re.MULTILINE)
+        if "#" in text:
+            text = _RE_HEADING.sub("", text)
 
         return text.strip()
 
     @staticmethod
     def format_sources(docs: List[Document]) -> str:
         """Format source documents for display with enhanced metadata and links."""
+        # Grab a raw content snippet per document, then clean and escape them
+        # in one batch before assembling the HTML. Escaping has to follow
+        # clean_markdown (which matches raw quotes), and str.replace/escape
+        # beat a str.translate table here: translate with multi-character
+        # replacements runs per character in Python-level mapping lookups.
+        previews = [
+            escape(
+                F1rstAidApp.clean_markdown(
+                    doc.page_content[:200].replace("\n", " ").strip()
+                )
+            )
+            for doc in docs
+        ]
+
         sources = []
-        for i, doc in enumerate(docs, 1):
+        for i, (doc, preview) in enumerate(zip(docs, previews), 1):
             source = doc.metadata.get("source", "Unknown")
             doc_type = doc.metadata.get("type", "unknown")
+            # A single f-string per block: no per-line list or join, and it
+            # compiles to direct concatenation, unlike a format_map template.
+            sources.append(
+                f"<div class='source-block'>\n"
+                f"<h4>Source {i}</h4>\n"
+                f"<div class='source-content'>\n"
+                f"<p><strong>Type:</strong> {doc_type.upper()}</p>\n"
+                f"<p><strong>Source:</strong> {F1rstAidApp._get_source_link(source, doc_type)}</p>\n"
+                f"<div class='preview-box'>\n"
+                f"<p><strong>Preview:</strong></p>\n"
+                f"<p class='preview-text'>{preview}...</p>\n"
+                f"</div>\n"
+                f"</div>\n"
+                f"</div>"
+            )
 
-            # 1) Grab raw content snippet
-            raw_preview = doc.page_content[:200].replace("\n", " ").strip()
-
-            # 2) Clean markdown
-            preview = F1rstAidApp.clean_markdown(raw_preview)
-            preview = escape(preview)
-
-            source_block = [
-                f"<div class='source-block'>",
-                f"<h4>Source {i}</h4>",
-                f"<div class='source-content'>",
-                f"<p><strong>Type:</strong> {doc_type.upper()}</p>",
-                f"<p><strong>Source:</strong> {F1rstAidApp._get_source_link(source, doc_type)}</p>",
-                f"<div class='preview-box'>",
-                f"<p><strong>Preview:</strong></p>",
-                f"<p class='preview-text'>{preview}...</p>",
-                "</div>",
-                "</div>",
-                "</div>",
-            ]
-            sources.append("\n".join(source_block))
-
-        # css = "<style>.source-block{background-color:#ffffff;border:1px solid #e1e4e8;margin:15px 0;padding:20px;border-radius:8px;box-shadow:0 2px 4px rgba(0,0,0,0.05);}.source-block h4{color:#0366d6;margin:0 0 15px 0;border-bottom:2px solid #0366d6;padding-bottom:5px;}.source-content{margin-left:10px;}.preview-box{background-color:#f6f8fa;padding:10px;border-radius:5px;margin-top:10px;}.preview-text{font-family:monospace;font-size:0.9em;line-height:1.4;white-space:pre-wrap;}a{color:#0366d6;text-decoration:none;padding:2px 4px;border-radius:3px;background-color:#f1f8ff;}a:hover{text-decoration:underline;background-color:#e1e4e8;}</style>"
-
-        css = """
-        <style>
-        .source-block {
-            background-color: #ffffff;
-            border: 1px solid #e1e4e8;
-            margin: 15px 0;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05);
-        }
-        .source-block h4 {
-            color: #0366d6;
-            margin: 0 0 15px 0;
-            border-bottom: 2px solid #0366d6;
-            padding-bottom: 5px;
-        }
-        .source-content {
-            margin-left: 10px;
-        }
-        .preview-box {
-            background-color: #f6f8fa;
-            padding: 10px;
-            border-radius: 5px;
-            margin-top: 10px;
-        }
-        .preview-text {
-            font-family: monospace;
-            font-size: 0.9em;
-            line-height: 1.4;
-            white-space: pre-wrap;
-        }
-        a {
-            color: #0366d6;
-            text-decoration: none;
-            padding: 2px 4px;
-            border-radius: 3px;
-            background-color: #f1f8ff;
-        }
-        a:hover {
-            text-decoration: underline;
-            background-color: #e1e4e8;
-        }
-        .source-reddit {
-            border-left: 3px solid #ff4500;  /* Reddit orange */
-        }
-        .source-official {
-            border-left: 3px solid #0366d6;  /* Official blue */
-        }
-        </style>
-        """
-        clean_css = F1rstAidApp.clean_markdown(
-            css
-        )  # Clean CSS to avoid markdown issues, especially """ blocks
-        return clean_css + "\n\n\n\n".join(sources)
+        return _SOURCE_CSS + "\n\n\n\n".join(sources)
 
     def format_answer(self, result: str, sources: List[Document]) -> str:
         """Format answer with source context."""
@@ -424,7 +619,7 @@ class F1rstAidApp:
     def display_answer(self, answer: Dict):
         """Display formatted answer and sources."""
         st.markdown("### 📝 Answer")
-        logging.info(f"Answer: {answer['result']}")
+        logging.info("Answer: %s", answer["result"])
         formatted_answer = self.format_answer(
             F1rstAidApp.clean_markdown(answer["result"]).strip(),
             answer.get("source_documents", []),
@@ -458,6 +653,62 @@ class F1rstAidApp:
                 )
 
 
+# Styles for format_sources, cleaned like the rest of the markdown (to avoid
+# issues with """ blocks) once at import instead of on every render.
+_SOURCE_CSS = F1rstAidApp.clean_markdown(
+    """
+        <style>
+        .source-block {
+            background-color: #ffffff;
+            border: 1px solid #e1e4e8;
+            margin: 15px 0;
+            padding: 20px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05);
+        }
+        .source-block h4 {
+            color: #0366d6;
+            margin: 0 0 15px 0;
+            border-bottom: 2px solid #0366d6;
+            padding-bottom: 5px;
+        }
+        .source-content {
+            margin-left: 10px;
+        }
+        .preview-box {
+            background-color: #f6f8fa;
+            padding: 10px;
+            border-radius: 5px;
+            margin-top: 10px;
+        }
+        .preview-text {
+            font-family: monospace;
+            font-size: 0.9em;
+            line-height: 1.4;
+            white-space: pre-wrap;
+        }
+        a {
+            color: #0366d6;
+            text-decoration: none;
+            padding: 2px 4px;
+            border-radius: 3px;
+            background-color: #f1f8ff;
+        }
+        a:hover {
+            text-decoration: underline;
+            background-color: #e1e4e8;
+        }
+        .source-reddit {
+            border-left: 3px solid #ff4500;  /* Reddit orange */
+        }
+        .source-official {
+            border-left: 3px solid #0366d6;  /* Official blue */
+        }
+        </style>
+        """
+)
+
+
 def handle_enter():
     """Handle Enter key press in text input."""
     if (
@@ -500,7 +751,7 @@ def process_query(question: str):
                 st.error("❌ Failed to generate answer. Please try again.")
 
     except Exception as e:
-        logging.error(f"Query processing error: {str(e)}")
+        logging.error("Query processing error: %s", e)
         st.error("An error occurred while processing your query.")
     finally:
         st.session_state.processing = False
@@ -513,8 +764,12 @@ def get_api_key() -> Optional[str]:
     return os.getenv("OPENAI_API_KEY")
 
 def set_api_key(api_key: str) -> None:
-    """Set API key in session state and environment."""
+    """Set API key in session state and environment, if it changed."""
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+    if st.session_state.get("api_key_hash") == key_hash:
+        return
     st.session_state.OPENAI_API_KEY = api_key
+    st.session_state.api_key_hash = key_hash
     os.environ["OPENAI_API_KEY"] = api_key
 
 
@@ -565,12 +820,19 @@ def main():
         global app
         # Initialize app only if API key is present
         if get_api_key():
-            config = AppConfig()
-            app = F1rstAidApp(config)
-            
-            if not app.initialize():
-                st.error("Failed to initialize application. Please check your API key.")
-                return
+            # Keep the app across reruns so the vector store is loaded once
+            # and the answer cache survives; rebuild it when the key changes.
+            app = st.session_state.get("app")
+            key_hash = st.session_state.get("api_key_hash")
+            if app is None or st.session_state.get("app_key_hash") != key_hash:
+                config = AppConfig()
+                app = F1rstAidApp(config)
+
+                if not app.initialize():
+                    st.error("Failed to initialize application. Please check your API key.")
+                    return
+                st.session_state.app = app
+                st.session_state.app_key_hash = key_hash
                 
             st.write("Ask me anything about F-1 visas!")
             
@@ -645,7 +907,7 @@ def main():
         )
 
     except Exception as e:
-        logging.error(f"Application error: {str(e)}")
+        logging.error("Application error: %s", e)
         st.error("An unexpected error occurred. Please try again later.")
 
 
@@ -35,4 +35,190 @@ def test_get_answer(app_config):
     answer = app.get_answer("What is OPT?")
     assert answer is not None
     assert "result" in answer
-    assert "source_documents" in answer
\ No newline at end of file
+    assert "source_documents" in answer
+
+def test_answer_cache(app_config):
+    """Test semantic answer caching and LRU eviction."""
+    import numpy as np
+
+    app_config.answer_cache_size = 2
+    app = F1rstAidApp(app_config)
+    app._init_answer_cache(4)
+
+    opt = np.array([[1, 0, 0, 0]], dtype="float32")
+    cpt = np.array([[0, 1, 0, 0]], dtype="float32")
+    stem = np.array([[0, 0, 1, 0]], dtype="float32")
+    assert app._lookup_cached_answer(opt) is None
+
+    app._cache_answer(opt, {"result": "opt"})
+    app._cache_answer(cpt, {"result": "cpt"})
+    paraphrase = np.array([[0.95, 0.05, 0, 0]], dtype="float32")
+    assert app._lookup_cached_answer(paraphrase)["result"] == "opt"
+    assert app._lookup_cached_answer(stem) is None
+
+    # "cpt" is now the least recently used entry and gets evicted.
+    app._cache_answer(stem, {"result": "stem"})
+    assert app._lookup_cached_answer(cpt) is None
+    assert app._lookup_cached_answer(opt)["result"] == "opt"
+
+def test_answer_cache_rejects_near_paraphrases(app_config):
+    """Test questions that differ in meaning but embed close together miss the cache."""
+    import numpy as np
+
+    app = F1rstAidApp(app_config)
+    app._init_answer_cache(2)
+
+    # Unit vectors at cosine 0.93, e.g. "work on OPT" vs "work on CPT" after graduation
+    opt = np.array([[1.0, 0.0]], dtype="float32")
+    cpt = np.array([[0.93, (1 - 0.93**2) ** 0.5]], dtype="float32")
+    app._cache_answer(opt, {"result": "opt"})
+
+    assert app._lookup_cached_answer(cpt) is None
+
+def test_clean_markdown():
+    """Test markdown stripping for answers and previews."""
+    text = (
+        "# OPT Guide\n"
+        "Apply with **Form I-765** via `USCIS` "
+        "[online](https://uscis.gov/i-765)\n"
+        "```\ncode\n```\n"
+        '"""\nquoted\n"""\n'
+        "  ## Timeline\n"
+        "~90~ _days_, see [mail](https://uscis.gov/tru"
+    )
+    assert F1rstAidApp.clean_markdown(text) == (
+        "OPT Guide\n"
+        "Apply with Form I-765 via USCIS online\n"
+        "Timeline\n"
+        "90 days, see mail"
+    )
+
+def test_tune_index(app_config, mock_documents, tmp_path):
+    """Test loading sets HNSW search breadth and never rewrites the index."""
+    import faiss
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = FakeEmbeddings(size=16)
+    db = FAISS.from_documents(mock_documents, embeddings)
+    hnsw = faiss.IndexHNSWFlat(16, 8)
+    hnsw.add(db.index.reconstruct_n(0, db.index.ntotal))
+    db.index = hnsw
+    db.save_local(str(tmp_path))
+    saved = (tmp_path / "index.faiss").read_bytes()
+    app_config.vector_store_path = str(tmp_path)
+    app = F1rstAidApp(app_config)
+    app.embeddings = embeddings
+
+    app.db = app._load_vector_store()
+    app._tune_index()
+    assert app.db.index.hnsw.efSearch == app_config.hnsw_ef_search
+    assert len(app.db.similarity_search("OPT", k=2)) == 2
+    assert (tmp_path / "index.faiss").read_bytes() == saved
+
+def test_load_vector_store_mmaps_only_ivf(app_config, mock_documents, tmp_path):
+    """Test IVF indexes are memory-mapped and other index types load normally."""
+    import faiss
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = FakeEmbeddings(size=16)
+    db = FAISS.from_documents(mock_documents, embeddings)
+    db.save_local(str(tmp_path))
+    app_config.vector_store_path = str(tmp_path)
+    app = F1rstAidApp(app_config)
+    app.embeddings = embeddings
+
+    assert isinstance(app._load_vector_store().index, faiss.IndexFlatL2)
+
+    vectors = db.index.reconstruct_n(0, db.index.ntotal)
+    ivf = faiss.IndexIVFFlat(faiss.IndexFlatL2(16), 16, 1)
+    ivf.train(vectors)
+    ivf.add(vectors)
+    db.index = ivf
+    db.save_local(str(tmp_path))
+
+    loaded = app._load_vector_store()
+    invlists = faiss.extract_index_ivf(loaded.index).invlists
+    assert isinstance(faiss.downcast_InvertedLists(invlists), faiss.OnDiskInvertedLists)
+    assert len(loaded.similarity_search("OPT", k=2)) == 2
+
+def test_relevance_response_parsing(app_config):
+    """Test parsing of the structured relevance-check reply."""
+
+    class FakeChain:
+        def __init__(self, text):
+            self.text = text
+
+        def invoke(self, inputs):
+            return {"text": self.text}
+
+    app = F1rstAidApp(app_config)
+    app._relevance_chain = FakeChain(
+        "Relevance: no\nReason: Not about visas.\nGuidance: Ask about OPT or CPT.\n"
+    )
+    assert app._is_relevant_question("Can you tell me about the rules?") == (
+        False,
+        "Not about visas. Ask about OPT or CPT.",
+    )
+
+    app._relevance_chain = FakeChain("relevance: yes")
+    relevant, _ = app._is_relevant_question("Can you tell me about the rules?")
+    assert relevant is True
+
+    # Bracketed and markdown-formatted fields, with no Guidance line
+    app._relevance_chain = FakeChain("**Relevance:** [no]\n**Reason:** [Not about visas.]\n")
+    assert app._is_relevant_question("Can you tell me about the rules?") == (
+        False,
+        "Not about visas. Unable to parse response.",
+    )
+
+def test_get_answer_embeds_only_when_needed(app_config):
+    """Test help and lexically off-topic questions never pay for an embedding."""
+
+    class CountingEmbeddings:
+        def __init__(self):
+            self.calls = 0
+
+        def embed_query(self, text):
+            self.calls += 1
+            return [0.0] * 4
+
+    class FakeChain:
+        def invoke(self, inputs):
+            return {"text": "Relevance: no\nReason: Not about visas.\nGuidance: Ask about OPT."}
+
+    app = F1rstAidApp(app_config)
+    app.embeddings = CountingEmbeddings()
+    app._relevance_chain = FakeChain()
+
+    assert "My Expertise" in app.get_answer("help")["result"]
+    assert "Relevance Check" in app.get_answer("Any good pasta recipes?")["result"]
+    assert app.embeddings.calls == 0
+
+    # Inconclusive questions overlap the LLM check with the embedding
+    assert "Not about visas." in app.get_answer("Can you tell me about the rules?")["result"]
+    assert app.embeddings.calls == 1
+
+def test_lexical_relevance_prefilter(app_config):
+    """Test the prefilter decides only unambiguous questions."""
+    app = F1rstAidApp(app_config)
+
+    for question in (
+        "how do i fill out the i-765?",
+        "can i travel on stem opt?",
+        "is opt processing slow this year?",
+        "does cpt count against f-1 status?",
+    ):
+        assert app._lexical_relevance(question) == (True, "Question mentions an F-1 topic")
+
+    relevant, _ = app._lexical_relevance("what's the weather like today?")
+    assert relevant is False
+
+    # Everyday uses of "opt", "stem" and "visa" are left to the LLM
+    for question in (
+        "how do i opt out of emails?",
+        "what is stem cell research?",
+        "which credit card is best, visa or mastercard?",
+    ):
+        assert app._lexical_relevance(question) is None
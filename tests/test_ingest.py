@@ -1,5 +1,9 @@
+import faiss
+import numpy as np
 import pytest
-from ingest import ContentProcessor
+from langchain_core.documents import Document
+import ingest
+from ingest import ContentProcessor, dedupe_chunks
 
 def test_content_validation(mock_documents):
     """Test document content validation."""
@@ -26,4 +30,105 @@ async def test_reddit_scraping():
     for doc in docs:
         assert doc.metadata["type"] == "reddit"
         assert "score" in doc.metadata
-        assert len(doc.page_content) > 100
\ No newline at end of file
+        assert len(doc.page_content) > 100
+
+
+def test_dedupe_chunks():
+    """Test duplicate chunks are dropped, keeping the first occurrence."""
+    chunks = [
+        Document(page_content="OPT basics", metadata={"source": "a"}),
+        Document(page_content="CPT basics", metadata={"source": "b"}),
+        Document(page_content="OPT basics", metadata={"source": "c"}),
+    ]
+
+    unique = dedupe_chunks(chunks)
+
+    assert [c.metadata["source"] for c in unique] == ["a", "b"]
+
+
+def test_preprocess_text():
+    """Test acronym expansion, including the STEM OPT special cases."""
+    text = "F visa holders on OPT or CPT may apply for STEM OPT Extension. STEM OPT."
+
+    assert ContentProcessor.preprocess_text(text) == (
+        "F-1 visa holders on Optional Practical Training (OPT) or "
+        "Curricular Practical Training (CPT) may apply for "
+        "STEM Optional Practical Training (OPT) Extension. "
+        "STEM Optional Practical Training (OPT)."
+    )
+
+
+def test_pdf_cache(tmp_path, monkeypatch):
+    """Test parsed PDF pages are reused until the file changes."""
+    monkeypatch.setattr(ingest, "PDF_CACHE_DIR", str(tmp_path / "cache"))
+    pdf = tmp_path / "guide.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    docs = [Document(page_content="OPT guide", metadata={"page": 0})]
+
+    ingest._write_pdf_cache(str(pdf), pdf.stat(), docs)
+    cached = ingest._read_pdf_cache(str(pdf), pdf.stat())
+    assert [d.page_content for d in cached] == ["OPT guide"]
+
+    pdf.write_bytes(b"%PDF-1.4 changed")
+    assert ingest._read_pdf_cache(str(pdf), pdf.stat()) is None
+
+
+def test_split_documents_merges_small_chunks():
+    """Test trailing fragments are merged into the previous chunk of the same doc."""
+    processor = ContentProcessor()
+    body = "The OPT application window opens 90 days before graduation. " * 16
+    docs = [
+        Document(page_content=body + "\n\nShort tail.", metadata={"source": "a"}),
+        Document(page_content="Short doc.", metadata={"source": "b"}),
+    ]
+
+    chunks = processor.split_documents(docs)
+
+    assert all(len(c.page_content) <= 1100 for c in chunks)
+    assert chunks[-2].page_content.endswith("\nShort tail.")
+    assert chunks[-1].page_content == "Short doc."
+    assert chunks[-1].metadata == {"source": "b"}
+
+
+def test_build_index():
+    """Test flat indexes are rebuilt as float16, with IVF for large corpora."""
+    rng = np.random.default_rng(0)
+    vectors = rng.random((500, 16), dtype=np.float32)
+    flat = faiss.IndexFlatL2(16)
+    flat.add(vectors)
+
+    small = ingest.build_index(flat)
+    assert isinstance(small, faiss.IndexScalarQuantizer)
+    _, ids = small.search(vectors[:5], 1)
+    assert ids[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+    flat.add(rng.random((ingest.IVF_MIN_VECTORS, 16), dtype=np.float32))
+    large = ingest.build_index(flat)
+    assert isinstance(large, faiss.IndexIVFScalarQuantizer)
+    assert large.ntotal == flat.ntotal
+    assert large.nprobe == ingest.IVF_NPROBE
+    _, ids = large.search(vectors[:5], 1)
+    assert ids[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_html_to_markdown_does_not_leak_state():
+    """Test converting one page doesn't change the markdown of the next."""
+    page = "<ul><li>CPT</li></ul><p>Apply early.</p>"
+    expected = ingest._html_to_markdown(page)
+
+    ingest._html_to_markdown("<p><abbr title='Optional'>OPT</abbr></p><ul><li>a")
+
+    assert ingest._html_to_markdown(page) == expected
+
+
+def test_worker_pools_start_on_first_use():
+    """Test the worker pools are only started when needed and stopped by close()."""
+    processor = ContentProcessor()
+    assert processor._pdf_pool is None and processor._html_pool is None
+
+    pool = processor._html_executor()
+    assert processor._html_executor() is pool
+    assert processor._pdf_pool is None
+
+    processor.close()
+    assert processor._html_pool is None
@@ -1,4 +1,6 @@
 import pytest
+import update_knowledge
+from ingest import ContentProcessor
 from update_knowledge import append_to_vector_store
 
 def test_vector_store_update(mock_documents):
@@ -14,4 +16,61 @@ def test_document_preprocessing(mock_documents):
         processed_text = processor.preprocess_text(doc.page_content)
         assert processed_text != ""
         if "F student" in doc.page_content:
-            assert "F-1 student" in processed_text
\ No newline at end of file
+            assert "F-1 student" in processed_text
+
+
+def test_update_knowledge_base(monkeypatch):
+    """Test scraped Reddit content is validated, expanded and appended."""
+    from langchain_core.documents import Document
+
+    scraped = [
+        Document(
+            page_content="Title: OPT approved\n\nContent: My OPT was approved in two months.",
+            metadata={"source": "https://reddit.com/r/f1visa/1", "type": "reddit"},
+        ),
+        Document(
+            page_content="Too short",
+            metadata={"source": "https://reddit.com/r/f1visa/2", "type": "reddit"},
+        ),
+    ]
+
+    async def fake_scrape_reddit(self):
+        return scraped
+
+    appended = []
+    monkeypatch.setattr(ContentProcessor, "scrape_reddit", fake_scrape_reddit)
+    monkeypatch.setattr(
+        update_knowledge,
+        "append_to_vector_store",
+        lambda docs: appended.extend(docs) or True,
+    )
+
+    assert update_knowledge.update_knowledge_base() is True
+    assert [doc.metadata["source"] for doc in appended] == ["https://reddit.com/r/f1visa/1"]
+    assert "Optional Practical Training (OPT)" in appended[0].page_content
+
+
+def test_append_skips_indexed_chunks(mock_documents, tmp_path, monkeypatch):
+    """Test chunks already in the index are not embedded or added again."""
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    class CountingEmbeddings(FakeEmbeddings):
+        def embed_documents(self, texts):
+            embedded.extend(texts)
+            return super().embed_documents(texts)
+
+    embedded = []
+    embeddings = CountingEmbeddings(size=16)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(update_knowledge, "get_embeddings", lambda: embeddings)
+    FAISS.from_documents(mock_documents, embeddings).save_local("faiss_index")
+    embedded.clear()
+
+    new_doc = Document(page_content="CPT requires a signed I-20.", metadata={"type": "web"})
+    assert append_to_vector_store([*mock_documents, new_doc]) is True
+    assert embedded == [new_doc.page_content]
+
+    db = FAISS.load_local("faiss_index", embeddings, allow_dangerous_deserialization=True)
+    assert db.index.ntotal == len(mock_documents) + 1
@@ -0,0 +1,33 @@
+import faiss
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+
+import validate_index
+
+
+def test_upgrade_flat_index(mock_documents, tmp_path, monkeypatch):
+    """Test a large flat index is rebuilt as HNSW and saved in place."""
+    embeddings = FakeEmbeddings(size=16)
+    FAISS.from_documents(mock_documents, embeddings).save_local(str(tmp_path))
+    monkeypatch.setattr(validate_index, "HNSW_MIN_VECTORS", 2)
+
+    assert validate_index.upgrade_flat_index(str(tmp_path)) is True
+
+    reloaded = faiss.read_index(str(tmp_path / "index.faiss"))
+    assert isinstance(reloaded, faiss.IndexHNSWFlat)
+    assert reloaded.ntotal == len(mock_documents)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["index.faiss", "index.pkl"]
+
+    db = FAISS.load_local(str(tmp_path), embeddings, allow_dangerous_deserialization=True)
+    assert len(db.similarity_search("OPT", k=2)) == 2
+
+    # Already upgraded, so a second run leaves it alone
+    assert validate_index.upgrade_flat_index(str(tmp_path)) is False
+
+
+def test_upgrade_flat_index_skips_missing_or_unreadable_index(tmp_path):
+    """Test a missing or corrupt index is left for the validation to report."""
+    assert validate_index.upgrade_flat_index(str(tmp_path / "missing")) is False
+
+    (tmp_path / "index.faiss").write_bytes(b"not an index")
+    assert validate_index.upgrade_flat_index(str(tmp_path)) is False
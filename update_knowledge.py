@@ -1,12 +1,13 @@
+import asyncio
 import logging
 from datetime import datetime
 from typing import List
 
 from langchain_core.documents import Document
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
-from ingest import ContentProcessor, scrape_reddit
+from embeddings import get_embeddings
+from ingest import ContentProcessor, dedupe_chunks
 
 # Configure logging
 logging.basicConfig(
@@ -20,13 +21,25 @@ def append_to_vector_store(docs: List[Document]) -> bool:
     """Append new documents to existing vector store."""
     try:
         # Load existing vector store
-        embeddings = OpenAIEmbeddings()
+        embeddings = get_embeddings()
         vector_store = FAISS.load_local(
             "faiss_index", embeddings, allow_dangerous_deserialization=True
         )
 
+        # Skip chunks already in the index so unchanged content isn't re-embedded
+        indexed = (
+            vector_store.docstore.search(doc_id)
+            for doc_id in vector_store.index_to_docstore_id.values()
+        )
+        indexed = (doc for doc in indexed if isinstance(doc, Document))
+        docs = dedupe_chunks(docs, existing=indexed)
+        if not docs:
+            logging.info("No new chunks to add")
+            return True
+
         # Add new documents
         vector_store.add_documents(docs)
+        logging.info(f"Added {len(docs)} new chunks to knowledge base")
 
         # Save updated vector store
         vector_store.save_local("faiss_index")
@@ -43,7 +56,7 @@ def update_knowledge_base() -> bool:
         processor = ContentProcessor()
 
         # Scrape new Reddit content
-        reddit_docs = scrape_reddit()
+        reddit_docs = asyncio.run(processor.scrape_reddit())
         if not reddit_docs:
             logging.warning("No new Reddit content found")
             return False
@@ -60,15 +73,10 @@ def update_knowledge_base() -> bool:
             return False
 
         # Create chunks
-        chunks = []
-        for doc in valid_docs:
-            chunks.extend(processor.text_splitter.split_documents([doc]))
+        chunks = processor.split_documents(valid_docs)
 
         # Append to vector store
-        if append_to_vector_store(chunks):
-            logging.info(f"Added {len(chunks)} new chunks to knowledge base")
-            return True
-        return False
+        return append_to_vector_store(chunks)
 
     except Exception as e:
         logging.error(f"Failed to update knowledge base: {e}")
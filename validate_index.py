@@ -1,10 +1,56 @@
 import os
 import logging
+import tempfile
 from typing import List, Tuple
+
+import faiss
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
+from embeddings import get_embeddings
+
+
+# Flat indexes with more vectors than this are rebuilt as HNSW graphs.
+HNSW_MIN_VECTORS = 5000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+
+
+def upgrade_flat_index(db_path: str = "faiss_index") -> bool:
+    """
+    Rebuild a large flat index in place as HNSW, whose search cost grows
+    roughly logarithmically instead of linearly with the number of vectors.
+    Only IndexFlatL2 stores from older ingests qualify; ingest.py already
+    writes IVF indexes for large corpora. Returns True if the index changed;
+    a missing or unreadable index is left for test_vector_store to report.
+    """
+    index_path = os.path.join(db_path, "index.faiss")
+    if not os.path.exists(index_path):
+        return False
+    try:
+        index = faiss.read_index(index_path)
+    except RuntimeError as e:
+        logging.error(f"Could not read {index_path}: {e}")
+        return False
+    if not isinstance(index, faiss.IndexFlatL2) or index.ntotal <= HNSW_MIN_VECTORS:
+        return False
+
+    logging.info(f"Upgrading flat index with {index.ntotal} vectors to HNSW...")
+    hnsw = faiss.IndexHNSWFlat(index.d, HNSW_M)
+    hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    hnsw.add(index.reconstruct_n(0, index.ntotal))
+
+    # Write beside the index under a unique name, then swap it in atomically
+    with tempfile.NamedTemporaryFile(dir=db_path, suffix=".faiss.tmp", delete=False) as f:
+        tmp_path = f.name
+    try:
+        faiss.write_index(hnsw, tmp_path)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return True
+
 
 def check_environment() -> bool:
     """Verify environment setup."""
@@ -64,7 +110,7 @@ def test_vector_store(db_path: str = "faiss_index") -> bool:
         return False
 
     try:
-        embeddings = OpenAIEmbeddings()
+        embeddings = get_embeddings()
         db = FAISS.load_local(db_path, embeddings, allow_dangerous_deserialization=True)
 
         test_queries = [
@@ -126,7 +172,11 @@ if __name__ == "__main__":
     )
 
     print("\n🔍 Starting Vector Store Validation...")
-    success = test_vector_store()
+    success = check_environment()
+    if success:
+        if upgrade_flat_index():
+            print("Rebuilt the flat index as HNSW for faster search.")
+        success = test_vector_store()
 
     if success:
         print("\n✅ Vector store validation PASSED!")